@@ -2,17 +2,22 @@
 """Webhook handler for DesireMovies-only Telegram bot."""
 
 import asyncio
-import json
 import logging
+import operator
 import os
 import re
-import secrets
 import time
-from http.server import BaseHTTPRequestHandler
-from urllib.parse import urlparse
-from typing import Any
+from base64 import urlsafe_b64encode
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
 
 import aiohttp
+import orjson
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, RedirectResponse, Response
+from starlette.routing import Route
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import (
     Application,
@@ -21,83 +26,159 @@ from telegram.ext import (
     ContextTypes,
     ConversationHandler,
 )
-
-logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
+from yarl import URL
+
+LOG_LEVEL = (os.getenv("LOG_LEVEL") or "INFO").strip().upper()
+# getLevelName returns an int only for registered level names; anything else must not crash startup.
+LOG_LEVEL_VALID = isinstance(logging.getLevelName(LOG_LEVEL), int)
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=LOG_LEVEL if LOG_LEVEL_VALID else logging.INFO,
+)
 logger = logging.getLogger(__name__)
+if not LOG_LEVEL_VALID:
+    logger.warning("Unknown LOG_LEVEL %r, falling back to INFO", LOG_LEVEL)
+
+T = TypeVar("T")
+
+try:
+    import uvloop
+except ImportError:
+    pass
+else:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
 API_BASE_URL = os.getenv("API_BASE_URL", "https://scarperapi-8lk0.onrender.com")
 BOT_TOKEN = os.getenv("BOT_TOKEN", "")
 API_KEY = os.getenv("API_KEY", "")
 WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+PORT = int(os.getenv("PORT", "10000"))
 
-HEADERS = {"x-api-key": API_KEY, "Content-Type": "application/json"}
+HEADERS = {"x-api-key": API_KEY}
 SELECTING_ITEM = 1
 _application = None
+_session: aiohttp.ClientSession | None = None
+_session_loop: asyncio.AbstractEventLoop | None = None
+INFLIGHT_UPDATES: set[asyncio.Task[None]] = set()
 REDIRECT_TTL_SECONDS = int(os.getenv("REDIRECT_TTL_SECONDS", "21600"))
-LINK_REDIRECTS: dict[str, tuple[str, float]] = {}
+MAX_REDIRECTS = int(os.getenv("MAX_REDIRECTS", "10000"))
+SET_WEBHOOK = os.getenv("SET_WEBHOOK", "1").strip().lower() not in {"0", "false", "no"}
+# Serverless platforms may freeze the function once the response is sent, so there updates are
+# processed before acknowledging; long-running servers acknowledge first and process in the background.
+ACK_BEFORE_PROCESSING = os.getenv(
+    "ACK_BEFORE_PROCESSING", "0" if os.getenv("VERCEL") else "1"
+).strip().lower() not in {"0", "false", "no"}
+LINK_REDIRECTS: OrderedDict[str, tuple[str, float]] = OrderedDict()
+QUALITY_KEY_PATTERN = re.compile(r"\b(\d{3,4}p|4k|hd|fhd|uhd|cam|hdrip|webrip)\b", re.IGNORECASE)
+EPISODE_NUMBER_PATTERN = re.compile(r"(?:e|ep|episode)\s*0*(\d+)", re.IGNORECASE)
+URL_KEYS = ("url", "link", "directLink", "download", "downloadUrl", "href")
+QUALITY_KEYS = ("quality", "label", "name")
+SIZE_KEYS = ("size", "fileSize")
+# Endpoint URLs are parsed once; each request only attaches its query string.
+API_ROOT = URL(API_BASE_URL) / "api"
+SEARCH_ENDPOINTS = (API_ROOT / "desiremovies" / "search", API_ROOT / "desiremoviess" / "search")
+DETAILS_ENDPOINTS = (API_ROOT / "desiremovies" / "details", API_ROOT / "desiremoviess" / "details")
+WALKABLE_TYPES = frozenset({str, list, dict})
+FIELD_KEY_RANKS = {
+    key: (field, rank) for field, keys in enumerate((URL_KEYS, QUALITY_KEYS, SIZE_KEYS)) for rank, key in enumerate(keys)
+}
+DETAILS_CACHE_TTL_SECONDS = int(os.getenv("DETAILS_CACHE_TTL_SECONDS", "600"))
+DETAILS_CACHE_MAX_ENTRIES = 256
+DETAILS_CACHE: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "60"))
+SEARCH_CACHE_MAX_ENTRIES = 512
+SEARCH_CACHE: OrderedDict[str, tuple[float, list[dict[str, Any]]]] = OrderedDict()
+INFLIGHT_FETCHES: dict[str, asyncio.Future[Any]] = {}
+# Fail fast on unreachable hosts and stalled reads; a response that keeps streaming gets the full budget.
+UPSTREAM_TIMEOUT = aiohttp.ClientTimeout(total=15, connect=5, sock_read=10)
+UPSTREAM_CONCURRENCY = int(os.getenv("UPSTREAM_CONCURRENCY", "50"))
+UPSTREAM_SEMAPHORE = asyncio.Semaphore(UPSTREAM_CONCURRENCY)
+FETCH_ATTEMPTS = 3
+MAX_RESPONSE_BYTES = 2 * 1024 * 1024
+RETRY_BACKOFF_SECONDS = 0.2
+PLACEHOLDER_LABELS = frozenset({"unknown", "n/a", "na", "none", "null"})
+PLACEHOLDER_MAX_LENGTH = max(map(len, PLACEHOLDER_LABELS))
+
+MOVIE_PATTERN = re.compile(r"^movie_\d+$")
+EPISODE_PATTERN = re.compile(r"^episode_\d+$")
+NEW_SEARCH_PATTERN = re.compile(r"^new_search$")
+CANCEL_PATTERN = re.compile(r"^cancel$")
+
+
+def _normalize_label(value: Any) -> str:
+    # Missing fields arrive as None and inherited labels as the literal default; neither needs work.
+    if value is None or value == "Unknown":
+        return "Unknown"
+    text = value.strip() if isinstance(value, str) else str(value or "").strip()
+    if not text or (len(text) <= PLACEHOLDER_MAX_LENGTH and text.lower() in PLACEHOLDER_LABELS):
+        return "Unknown"
+    return text
 
 
 def normalize_quality(quality: str | None) -> str:
-    text = str(quality or "").strip()
-    return text if text and text.lower() not in {"unknown", "n/a", "na", "none", "null"} else "Unknown"
+    return _normalize_label(quality)
 
 
 def normalize_size(size: str | None) -> str:
-    text = str(size or "").strip()
-    return text if text and text.lower() not in {"unknown", "n/a", "na", "none", "null"} else "Unknown"
+    return _normalize_label(size)
 
 
 def _episode_number_from_text(value: str) -> int | None:
-    match = re.search(r"(?:e|ep|episode)\s*0*(\d+)", value or "", re.IGNORECASE)
+    match = EPISODE_NUMBER_PATTERN.search(value or "")
     return int(match.group(1)) if match else None
 
 
 def normalize_download_links(raw_links: Any) -> list[dict[str, str]]:
-    links: list[dict[str, str]] = []
-    seen: set[str] = set()
+    links: dict[str, dict[str, str]] = {}
 
     def add(url: Any, quality: str = "Unknown", size: str = "Unknown") -> None:
         if not isinstance(url, str):
             return
         cleaned = url.strip()
-        if not cleaned.startswith(("http://", "https://")) or cleaned in seen:
+        if cleaned in links or not cleaned.startswith(("http://", "https://")):
             return
-        links.append({"quality": normalize_quality(quality), "size": normalize_size(size), "url": cleaned})
-        seen.add(cleaned)
-
-    def walk(node: Any, quality: str = "Unknown", size: str = "Unknown") -> None:
-        if isinstance(node, str):
+        links[cleaned] = {"quality": normalize_quality(quality), "size": normalize_size(size), "url": cleaned}
+
+    # Explicit stack instead of recursion; children are pushed in reverse so links keep document order.
+    stack: list[tuple[Any, str, str]] = [(raw_links, "Unknown", "Unknown")]
+    while stack:
+        node, quality, size = stack.pop()
+        # Decoded JSON only yields exact builtin types, so identity checks stand in for isinstance.
+        node_type = type(node)
+        if node_type is str:
             add(node, quality, size)
-            return
-        if isinstance(node, list):
-            for item in node:
-                walk(item, quality, size)
-            return
-        if not isinstance(node, dict):
-            return
-
-        current_quality = node.get("quality") or node.get("label") or node.get("name") or quality
-        current_size = node.get("size") or node.get("fileSize") or size
-        add(
-            node.get("url")
-            or node.get("link")
-            or node.get("directLink")
-            or node.get("download")
-            or node.get("downloadUrl")
-            or node.get("href"),
-            current_quality,
-            current_size,
-        )
-
+            continue
+        if node_type is list:
+            stack.extend((item, quality, size) for item in reversed(node))
+            continue
+        if node_type is not dict:
+            continue
+
+        # One pass over the items: pick the best-ranked truthy url/quality/size field and collect children.
+        found: list[Any] = [None, None, None]
+        ranks = [len(FIELD_KEY_RANKS)] * 3
+        children: list[tuple[Any, str | None]] = []
         for key, value in node.items():
-            next_quality = current_quality
-            if isinstance(key, str) and re.search(r"\b(\d{3,4}p|4k|hd|fhd|uhd|cam|hdrip|webrip)\b", key, re.IGNORECASE):
-                next_quality = key.strip()
-            if isinstance(value, (str, list, dict)):
-                walk(value, next_quality, current_size)
+            slot = FIELD_KEY_RANKS.get(key)
+            if slot is not None and value:
+                field, rank = slot
+                if rank < ranks[field]:
+                    ranks[field] = rank
+                    found[field] = value
+            if type(value) not in WALKABLE_TYPES:
+                continue
+            key_quality = None
+            if isinstance(key, str) and len(key) > 1 and QUALITY_KEY_PATTERN.search(key):
+                key_quality = key.strip()
+            children.append((value, key_quality))
+
+        url, node_quality, node_size = found
+        current_quality = node_quality or quality
+        current_size = node_size or size
+        add(url, current_quality, current_size)
+        stack.extend((value, key_quality or current_quality, current_size) for value, key_quality in reversed(children))
 
-    walk(raw_links)
-    return links
+    return list(links.values())
 
 
 def normalize_details_payload(raw: dict[str, Any], fallback_title: str = "Unknown") -> dict[str, Any]:
@@ -106,6 +187,9 @@ def normalize_details_payload(raw: dict[str, Any], fallback_title: str = "Unknow
     download_links = normalize_download_links(raw.get("downloadLinks") or raw.get("links") or raw.get("downloads"))
 
     episodes: list[dict[str, Any]] = []
+    # The API usually lists episodes in order already, so only sort when one is seen out of place.
+    in_order = True
+    previous_number = 0
     for index, episode in enumerate(raw.get("episodes") or [], start=1):
         episode_number = episode.get("episodeNumber")
         if not isinstance(episode_number, int):
@@ -114,98 +198,282 @@ def normalize_details_payload(raw: dict[str, Any], fallback_title: str = "Unknow
             episode.get("downloadLinks") or episode.get("links") or episode.get("downloads")
         )
         if episode_links:
-            episodes.append({"episodeNumber": int(episode_number), "downloadLinks": episode_links})
-
-    episodes.sort(key=lambda ep: ep["episodeNumber"])
+            episode_number = int(episode_number)
+            if episode_number < previous_number:
+                in_order = False
+            previous_number = episode_number
+            episodes.append({"episodeNumber": episode_number, "downloadLinks": episode_links})
+
+    if not in_order:
+        episodes.sort(key=operator.itemgetter("episodeNumber"))
     payload: dict[str, Any] = {"success": True, "type": "series" if episodes else payload_type, "title": title, "downloadLinks": download_links}
     if episodes:
         payload["episodes"] = episodes
     return payload
 
 
-async def desiremovies_search(session: aiohttp.ClientSession, query: str) -> list[dict[str, str]]:
-    endpoints = ("/api/desiremovies/search", "/api/desiremoviess/search")
-    for endpoint in endpoints:
-        async with session.get(f"{API_BASE_URL}{endpoint}", params={"q": query}, headers=HEADERS) as response:
-            if response.status != 200:
-                continue
+async def get_session() -> aiohttp.ClientSession:
+    # Some serverless adapters run each invocation on a fresh event loop. Sessions, semaphores and
+    # in-flight fetch tasks cannot cross loops, so all of them are rebuilt when the running loop changes.
+    global _session, _session_loop, UPSTREAM_SEMAPHORE
+    loop = asyncio.get_running_loop()
+    if _session_loop is not loop:
+        _session = None
+        _session_loop = loop
+        UPSTREAM_SEMAPHORE = asyncio.Semaphore(UPSTREAM_CONCURRENCY)
+        INFLIGHT_FETCHES.clear()
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            # Every request goes to the one API_BASE_URL host, so the pool is sized to the upstream semaphore.
+            connector=aiohttp.TCPConnector(limit=UPSTREAM_CONCURRENCY, ttl_dns_cache=300, keepalive_timeout=75),
+            timeout=UPSTREAM_TIMEOUT,
+            headers=HEADERS,
+        )
+    return _session
 
-            data = await response.json()
-            items = data.get("results") if isinstance(data, dict) else data
-            if not isinstance(items, list):
-                continue
 
-            results = [
-                {"title": str(item.get("title") or "Unknown").strip(), "url": str(item.get("url") or item.get("link") or "").strip()}
-                for item in items
-                if str(item.get("url") or item.get("link") or "").strip()
-            ]
-            if results:
-                return results
-    return []
+async def close_session() -> None:
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
 
 
-async def desiremovies_details(session: aiohttp.ClientSession, movie_url: str, fallback_title: str) -> dict[str, Any] | None:
-    endpoints = ("/api/desiremovies/details", "/api/desiremoviess/details")
-    for endpoint in endpoints:
-        async with session.get(f"{API_BASE_URL}{endpoint}", params={"url": movie_url}, headers=HEADERS) as response:
-            if response.status != 200:
+def _cache_get(cache: OrderedDict[str, tuple[float, Any]], key: str, ttl: float) -> Any:
+    entry = cache.get(key)
+    if entry is None:
+        return None
+
+    stored_at, value = entry
+    if time.monotonic() - stored_at >= ttl:
+        cache.pop(key, None)
+        return None
+
+    cache.move_to_end(key)
+    return value
+
+
+def _cache_put(cache: OrderedDict[str, tuple[float, Any]], key: str, value: Any, max_entries: int) -> None:
+    cache[key] = (time.monotonic(), value)
+    cache.move_to_end(key)
+    while len(cache) > max_entries:
+        cache.popitem(last=False)
+
+
+async def _read_json_capped(response: aiohttp.ClientResponse) -> Any:
+    # Bound per-request memory: refuse oversized bodies up front and stop reading once past the cap.
+    if response.content_length is not None and response.content_length > MAX_RESPONSE_BYTES:
+        logger.warning("Upstream response too large (%s bytes): %s", response.content_length, response.url)
+        return None
+    body = bytearray()
+    async for chunk in response.content.iter_chunked(65536):
+        body.extend(chunk)
+        if len(body) > MAX_RESPONSE_BYTES:
+            logger.warning("Upstream response exceeded %s bytes: %s", MAX_RESPONSE_BYTES, response.url)
+            return None
+    try:
+        return orjson.loads(body)
+    except ValueError:
+        logger.warning("Upstream returned invalid JSON: %s", response.url)
+        return None
+
+
+async def _fetch_json(session: aiohttp.ClientSession, url: URL) -> Any:
+    # Upstream GETs are idempotent, so 5xx answers and connection errors are retried with backoff.
+    # All attempts share one UPSTREAM_TIMEOUT.total budget, so retries never hold a user past it.
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + UPSTREAM_TIMEOUT.total
+    for attempt in range(FETCH_ATTEMPTS):
+        backoff = RETRY_BACKOFF_SECONDS * 2**attempt
+        try:
+            # Cap concurrent upstream requests; backoff sleeps happen outside so they don't hold a slot.
+            async with UPSTREAM_SEMAPHORE:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                timeout = aiohttp.ClientTimeout(
+                    total=remaining, connect=UPSTREAM_TIMEOUT.connect, sock_read=UPSTREAM_TIMEOUT.sock_read
+                )
+                async with session.get(url, timeout=timeout) as response:
+                    if response.status < 500:
+                        return await _read_json_capped(response) if response.status == 200 else None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == FETCH_ATTEMPTS - 1 or loop.time() + backoff >= deadline:
+                raise
+        else:
+            if attempt == FETCH_ATTEMPTS - 1 or loop.time() + backoff >= deadline:
+                return None
+        await asyncio.sleep(backoff)
+    return None
+
+
+def _parse_search_results(data: Any) -> list[dict[str, str]]:
+    items = data.get("results") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return []
+    return [
+        {"title": str(item.get("title") or "Unknown").strip(), "url": str(item.get("url") or item.get("link") or "").strip()}
+        for item in items
+        if str(item.get("url") or item.get("link") or "").strip()
+    ]
+
+
+async def _fetch_first(
+    session: aiohttp.ClientSession,
+    endpoints: tuple[URL, ...],
+    params: dict[str, str],
+    parse: Callable[[Any], T | None],
+) -> T | None:
+    # Endpoint variants race each other; the first usable answer wins and the rest are cancelled.
+    tasks = [asyncio.create_task(_fetch_json(session, endpoint.with_query(params))) for endpoint in endpoints]
+    errors: list[Exception] = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                data = await next_done
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                logger.error("Upstream request failed: %s", exc)
+                errors.append(exc)
                 continue
-            data = await response.json()
-            if isinstance(data, dict):
-                return normalize_details_payload(data, fallback_title=fallback_title)
+
+            result = parse(data)
+            if result:
+                return result
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if len(errors) == len(tasks):
+        error = errors[0]
+        if not isinstance(error, aiohttp.ClientError):
+            # aiohttp's total timeout raises a bare TimeoutError; callers only handle ClientError.
+            raise aiohttp.ServerTimeoutError(f"Upstream request timed out: {error}") from error
+        raise error
     return None
 
 
+async def _single_flight(key: str, fetch: Callable[[], Awaitable[T]]) -> T:
+    # Concurrent cache misses for one key share a single upstream fetch. shield() keeps one caller's
+    # cancellation from cancelling the fetch for everyone else waiting on it.
+    task = INFLIGHT_FETCHES.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        INFLIGHT_FETCHES[key] = task
+        task.add_done_callback(lambda _: INFLIGHT_FETCHES.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def desiremovies_search(session: aiohttp.ClientSession, query: str) -> list[dict[str, str]]:
+    # Queries that differ only in case or surrounding whitespace share one cache entry.
+    cache_key = query.strip().lower()
+    cached = _cache_get(SEARCH_CACHE, cache_key, SEARCH_CACHE_TTL_SECONDS)
+    if cached is not None:
+        return cached
+
+    async def fetch() -> list[dict[str, str]]:
+        results = await _fetch_first(session, SEARCH_ENDPOINTS, {"q": query}, _parse_search_results)
+        if not results:
+            return []
+
+        _cache_put(SEARCH_CACHE, cache_key, results, SEARCH_CACHE_MAX_ENTRIES)
+        return results
+
+    return await _single_flight(f"search:{cache_key}", fetch)
+
+
+async def desiremovies_details(session: aiohttp.ClientSession, movie_url: str, fallback_title: str) -> dict[str, Any] | None:
+    # Cached and coalesced payloads are shared across callers, so they are normalized without a
+    # fallback title and each caller's own fallback is applied on the way out.
+    def parse(data: Any) -> dict[str, Any] | None:
+        return normalize_details_payload(data, fallback_title="") if isinstance(data, dict) else None
+
+    async def fetch() -> dict[str, Any] | None:
+        details = await _fetch_first(session, DETAILS_ENDPOINTS, {"url": movie_url}, parse)
+        if details:
+            _cache_put(DETAILS_CACHE, movie_url, details, DETAILS_CACHE_MAX_ENTRIES)
+        return details
+
+    details = _cache_get(DETAILS_CACHE, movie_url, DETAILS_CACHE_TTL_SECONDS)
+    if details is None:
+        details = await _single_flight(f"details:{movie_url}", fetch)
+    if details and not details["title"]:
+        details = {**details, "title": fallback_title}
+    return details
+
+
+CANCEL_ROW = (InlineKeyboardButton("❌ Cancel", callback_data="cancel"),)
+NEW_SEARCH_ROW = (InlineKeyboardButton("🔍 New Search", callback_data="new_search"),)
+
+
 def build_search_keyboard(results: list[dict[str, str]]) -> InlineKeyboardMarkup:
     rows = [[InlineKeyboardButton(result["title"], callback_data=f"movie_{idx}")] for idx, result in enumerate(results)]
-    rows.append([InlineKeyboardButton("❌ Cancel", callback_data="cancel")])
+    rows.append(CANCEL_ROW)
     return InlineKeyboardMarkup(rows)
 
 
+def _prune_redirects(now: float) -> None:
+    # Every token shares one TTL, so insertion order is expiry order and stale entries sit at the front.
+    while LINK_REDIRECTS:
+        _, expires_at = next(iter(LINK_REDIRECTS.values()))
+        if expires_at > now and len(LINK_REDIRECTS) <= MAX_REDIRECTS:
+            break
+        LINK_REDIRECTS.popitem(last=False)
+
+
 def _build_redirect_url(target_url: str) -> str:
     base_url = WEBHOOK_URL.strip().rstrip("/")
     if not base_url:
         return target_url
 
-    token = secrets.token_urlsafe(8)
-    LINK_REDIRECTS[token] = (target_url, time.time() + REDIRECT_TTL_SECONDS)
+    # 6 random bytes encode to exactly 8 base64 characters, so there is no padding to strip.
+    token = urlsafe_b64encode(os.urandom(6)).decode("ascii")
+    now = time.monotonic()
+    LINK_REDIRECTS[token] = (target_url, now + REDIRECT_TTL_SECONDS)
+    _prune_redirects(now)
     return f"{base_url}/r/{token}"
 
 
 def build_download_keyboard(download_links: list[dict[str, str]]) -> InlineKeyboardMarkup:
-    rows = [[InlineKeyboardButton(f"🎬 {normalize_quality(link.get('quality'))} | {normalize_size(link.get('size'))}", url=_build_redirect_url(link["url"]))] for link in download_links]
-    rows.append([InlineKeyboardButton("🔍 New Search", callback_data="new_search")])
+    rows = [[InlineKeyboardButton(f"🎬 {link['quality']} | {link['size']}", url=_build_redirect_url(link["url"]))] for link in download_links]
+    rows.append(NEW_SEARCH_ROW)
     return InlineKeyboardMarkup(rows)
 
 
 def build_episode_keyboard(episodes: list[dict[str, Any]]) -> InlineKeyboardMarkup:
     rows = [[InlineKeyboardButton(f"Episode {episode['episodeNumber']}", callback_data=f"episode_{idx}")] for idx, episode in enumerate(episodes)]
-    rows.append([InlineKeyboardButton("🔍 New Search", callback_data="new_search")])
+    rows.append(NEW_SEARCH_ROW)
     return InlineKeyboardMarkup(rows)
 
 
+WELCOME_TEXT = "🎬 Welcome! Use /search <movie name> to find DesireMovies links."
+HELP_TEXT = "Use /search <movie name>.\nMovies and series links are provided via inline buttons."
+SEARCH_USAGE_TEXT = "Please use /search <movie name>."
+SEARCHING_TEXT = "🔍 Searching: <code>{query}</code>"
+SEARCH_ERROR_TEXT = "Unable to connect to API."
+DETAILS_ERROR_TEXT = "Unable to fetch details."
+
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    await update.message.reply_text("🎬 Welcome! Use /search <movie name> to find DesireMovies links.")
+    await update.message.reply_text(WELCOME_TEXT)
 
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    await update.message.reply_text("Use /search <movie name>.\nMovies and series links are provided via inline buttons.")
+    await update.message.reply_text(HELP_TEXT)
 
 
 async def search_movies(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query_text = " ".join(context.args).strip()
     if not query_text:
-        await update.message.reply_text("Please use /search <movie name>.")
+        await update.message.reply_text(SEARCH_USAGE_TEXT)
         return ConversationHandler.END
 
-    status = await update.message.reply_text(f"🔍 Searching: <code>{query_text}</code>", parse_mode="HTML")
+    status = await update.message.reply_text(SEARCHING_TEXT.format(query=query_text), parse_mode="HTML")
 
     try:
-        async with aiohttp.ClientSession() as session:
-            results = await desiremovies_search(session, query_text)
+        results = await desiremovies_search(await get_session(), query_text)
     except aiohttp.ClientError:
-        await status.edit_text("Unable to connect to API.")
+        await status.edit_text(SEARCH_ERROR_TEXT)
         return ConversationHandler.END
 
     if not results:
@@ -236,10 +504,9 @@ async def on_movie_selected(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await query.edit_message_text(f"Fetching: {selected['title']}")
 
     try:
-        async with aiohttp.ClientSession() as session:
-            details = await desiremovies_details(session, selected["url"], selected["title"])
+        details = await desiremovies_details(await get_session(), selected["url"], selected["title"])
     except aiohttp.ClientError:
-        await query.edit_message_text("Unable to fetch details.")
+        await query.edit_message_text(DETAILS_ERROR_TEXT)
         return ConversationHandler.END
 
     if not details:
@@ -317,10 +584,10 @@ def _setup_handlers(application: Application) -> None:
         entry_points=[CommandHandler("search", search_movies)],
         states={
             SELECTING_ITEM: [
-                CallbackQueryHandler(on_movie_selected, pattern=r"^movie_\d+$"),
-                CallbackQueryHandler(on_episode_selected, pattern=r"^episode_\d+$"),
-                CallbackQueryHandler(new_search, pattern=r"^new_search$"),
-                CallbackQueryHandler(cancel, pattern=r"^cancel$"),
+                CallbackQueryHandler(on_movie_selected, pattern=MOVIE_PATTERN),
+                CallbackQueryHandler(on_episode_selected, pattern=EPISODE_PATTERN),
+                CallbackQueryHandler(new_search, pattern=NEW_SEARCH_PATTERN),
+                CallbackQueryHandler(cancel, pattern=CANCEL_PATTERN),
             ]
         },
         fallbacks=[CommandHandler("cancel", cancel)],
@@ -339,66 +606,92 @@ def get_application() -> Application:
     return _application
 
 
-class handler(BaseHTTPRequestHandler):
-    def do_GET(self) -> None:
-        parsed = urlparse(self.path)
-        if parsed.path.startswith("/r/"):
-            token = parsed.path.rsplit("/", 1)[-1]
-            entry = LINK_REDIRECTS.get(token)
-            if not entry:
-                self.send_response(404)
-                self.end_headers()
-                self.wfile.write(b"Link expired or invalid")
-                return
-
-            target_url, expires_at = entry
-            if time.time() > expires_at:
-                LINK_REDIRECTS.pop(token, None)
-                self.send_response(410)
-                self.end_headers()
-                self.wfile.write(b"Link expired")
-                return
-
-            self.send_response(302)
-            self.send_header("Location", target_url)
-            self.end_headers()
-            return
+OK_BODY = orjson.dumps({"status": "ok"})
+ERROR_BODY = orjson.dumps({"status": "error"})
 
-        self.send_response(200)
-        self.send_header("Content-type", "application/json")
-        self.end_headers()
-        self.wfile.write(json.dumps({"status": "ok"}).encode())
 
-    def do_POST(self) -> None:
-        content_length = int(self.headers.get("Content-Length", 0))
-        post_data = self.rfile.read(content_length)
+def _json_response(body: bytes, status_code: int = 200) -> Response:
+    return Response(body, status_code=status_code, media_type="application/json")
+
+
+async def health(request: Request) -> Response:
+    return _json_response(OK_BODY)
 
-        try:
-            update_data = json.loads(post_data.decode("utf-8"))
-            update = Update.de_json(update_data, None)
-            app = get_application()
-
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(app.process_update(update))
-            loop.close()
-
-            self.send_response(200)
-            self.send_header("Content-type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps({"status": "ok"}).encode())
-        except Exception as exc:
-            logger.error("Error processing webhook update: %s", exc)
-            self.send_response(500)
-            self.send_header("Content-type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps({"status": "error"}).encode())
 
+async def redirect(request: Request) -> Response:
+    token = request.path_params["token"]
+    entry = LINK_REDIRECTS.get(token)
+    if not entry:
+        return PlainTextResponse("Link expired or invalid", status_code=404)
 
-if BOT_TOKEN and WEBHOOK_URL:
+    target_url, expires_at = entry
+    remaining = expires_at - time.monotonic()
+    if remaining < 0:
+        return PlainTextResponse("Link expired", status_code=410)
+
+    # Let the client reuse the redirect on repeat taps until the token expires.
+    return RedirectResponse(target_url, status_code=302, headers={"Cache-Control": f"private, max-age={int(remaining)}"})
+
+
+async def _process_update(application: Application, update: Update) -> None:
+    try:
+        await application.process_update(update)
+    except Exception as exc:
+        logger.error("Error processing webhook update: %s", exc)
+
+
+async def webhook(request: Request) -> Response:
     try:
-        app = get_application()
-        webhook_url = f"{WEBHOOK_URL}/webhook"
-        asyncio.get_event_loop().run_until_complete(app.bot.set_webhook(webhook_url))
+        application = get_application()
+        update = Update.de_json(orjson.loads(await request.body()), application.bot)
     except Exception as exc:
-        logger.error("Webhook setup failed: %s", exc)
+        logger.error("Error parsing webhook update: %s", exc)
+        return _json_response(ERROR_BODY, status_code=500)
+
+    if not ACK_BEFORE_PROCESSING:
+        await _process_update(application, update)
+        return _json_response(OK_BODY)
+
+    # Acknowledge right away so Telegram does not hold the connection or redeliver slow updates.
+    task = asyncio.create_task(_process_update(application, update))
+    INFLIGHT_UPDATES.add(task)
+    task.add_done_callback(INFLIGHT_UPDATES.discard)
+    return _json_response(OK_BODY)
+
+
+@asynccontextmanager
+async def lifespan(_: Starlette) -> AsyncIterator[None]:
+    application = get_application()
+    await application.initialize()
+    if WEBHOOK_URL and SET_WEBHOOK:
+        try:
+            await application.bot.set_webhook(f"{WEBHOOK_URL}/webhook")
+        except Exception as exc:
+            logger.error("Webhook setup failed: %s", exc)
+    try:
+        yield
+    finally:
+        await asyncio.gather(*INFLIGHT_UPDATES, return_exceptions=True)
+        await application.shutdown()
+        await close_session()
+
+
+app = Starlette(
+    routes=[
+        Route("/", health),
+        Route("/health", health),
+        Route("/r/{token}", redirect),
+        Route("/webhook", webhook, methods=["POST"]),
+    ],
+    lifespan=lifespan,
+)
+
+if BOT_TOKEN:
+    # Build the handler graph during cold start instead of on the first update.
+    get_application()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=PORT, loop="auto")
@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
 """Telegram bot using DesireMovies-only search/details endpoints."""
 
+import asyncio
 import os
 import logging
+import operator
 import re
-import secrets
 import time
-from typing import Any
+from base64 import urlsafe_b64encode
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, TypeVar
 
 import aiohttp
+import orjson
 from aiohttp import web
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import (
@@ -20,9 +24,20 @@ from telegram.ext import (
     MessageHandler,
     filters,
 )
-
-logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
+from yarl import URL
+
+LOG_LEVEL = (os.getenv("LOG_LEVEL") or "INFO").strip().upper()
+# getLevelName returns an int only for registered level names; anything else must not crash startup.
+LOG_LEVEL_VALID = isinstance(logging.getLevelName(LOG_LEVEL), int)
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=LOG_LEVEL if LOG_LEVEL_VALID else logging.INFO,
+)
 logger = logging.getLogger(__name__)
+if not LOG_LEVEL_VALID:
+    logger.warning("Unknown LOG_LEVEL %r, falling back to INFO", LOG_LEVEL)
+
+T = TypeVar("T")
 
 API_BASE_URL = os.getenv("API_BASE_URL", "https://scarperapi-8lk0.onrender.com")
 BOT_TOKEN = os.getenv("BOT_TOKEN", "")
@@ -32,6 +47,7 @@ ENABLE_HTTP_SERVER = os.getenv("ENABLE_HTTP_SERVER", "true").lower() == "true"
 WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").strip()
 WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "webhook").strip("/") or "webhook"
 REDIRECT_TTL_SECONDS = int(os.getenv("REDIRECT_TTL_SECONDS", "21600"))
+MAX_REDIRECTS = int(os.getenv("MAX_REDIRECTS", "10000"))
 
 
 def infer_webhook_url() -> str:
@@ -54,11 +70,45 @@ def infer_webhook_url() -> str:
 
     return ""
 
-HEADERS = {"x-api-key": API_KEY, "Content-Type": "application/json"}
+HEADERS = {"x-api-key": API_KEY}
 
 SELECTING_ITEM = 1
 TOKEN_PATTERN = re.compile(r"^\d+:[A-Za-z0-9_-]{20,}$")
-LINK_REDIRECTS: dict[str, tuple[str, float]] = {}
+LINK_REDIRECTS: OrderedDict[str, tuple[str, float]] = OrderedDict()
+QUALITY_KEY_PATTERN = re.compile(r"\b(\d{3,4}p|4k|hd|fhd|uhd|cam|hdrip|webrip)\b", re.IGNORECASE)
+EPISODE_NUMBER_PATTERN = re.compile(r"(?:e|ep|episode)\s*0*(\d+)", re.IGNORECASE)
+MOVIE_PATTERN = re.compile(r"^movie_\d+$")
+EPISODE_PATTERN = re.compile(r"^episode_\d+$")
+NEW_SEARCH_PATTERN = re.compile(r"^new_search$")
+CANCEL_PATTERN = re.compile(r"^cancel$")
+URL_KEYS = ("url", "link", "directLink", "download", "downloadUrl", "href")
+QUALITY_KEYS = ("quality", "label", "name")
+SIZE_KEYS = ("size", "fileSize")
+# Endpoint URLs are parsed once; each request only attaches its query string.
+API_ROOT = URL(API_BASE_URL) / "api"
+SEARCH_ENDPOINTS = (API_ROOT / "desiremovies" / "search", API_ROOT / "desiremoviess" / "search")
+DETAILS_ENDPOINTS = (API_ROOT / "desiremovies" / "details", API_ROOT / "desiremoviess" / "details")
+WALKABLE_TYPES = frozenset({str, list, dict})
+FIELD_KEY_RANKS = {
+    key: (field, rank) for field, keys in enumerate((URL_KEYS, QUALITY_KEYS, SIZE_KEYS)) for rank, key in enumerate(keys)
+}
+DETAILS_CACHE_TTL_SECONDS = int(os.getenv("DETAILS_CACHE_TTL_SECONDS", "600"))
+DETAILS_CACHE_MAX_ENTRIES = 256
+DETAILS_CACHE: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "60"))
+SEARCH_CACHE_MAX_ENTRIES = 512
+SEARCH_CACHE: OrderedDict[str, tuple[float, list[dict[str, Any]]]] = OrderedDict()
+INFLIGHT_FETCHES: dict[str, asyncio.Future[Any]] = {}
+# Fail fast on unreachable hosts and stalled reads; a response that keeps streaming gets the full budget.
+UPSTREAM_TIMEOUT = aiohttp.ClientTimeout(total=15, connect=5, sock_read=10)
+UPSTREAM_CONCURRENCY = int(os.getenv("UPSTREAM_CONCURRENCY", "50"))
+UPSTREAM_SEMAPHORE = asyncio.Semaphore(UPSTREAM_CONCURRENCY)
+FETCH_ATTEMPTS = 3
+MAX_RESPONSE_BYTES = 2 * 1024 * 1024
+RETRY_BACKOFF_SECONDS = 0.2
+HTTP_SESSION_KEY = web.AppKey("http_session", aiohttp.ClientSession)
+PLACEHOLDER_LABELS = frozenset({"unknown", "n/a", "na", "none", "null"})
+PLACEHOLDER_MAX_LENGTH = max(map(len, PLACEHOLDER_LABELS))
 
 
 def validate_bot_token(token: str) -> str:
@@ -70,87 +120,100 @@ def validate_bot_token(token: str) -> str:
     return cleaned
 
 
-def normalize_quality(quality: str | None) -> str:
-    text = str(quality or "").strip()
-    if not text or text.lower() in {"unknown", "n/a", "na", "none", "null"}:
+def _normalize_label(value: Any) -> str:
+    # Missing fields arrive as None and inherited labels as the literal default; neither needs work.
+    if value is None or value == "Unknown":
+        return "Unknown"
+    text = value.strip() if isinstance(value, str) else str(value or "").strip()
+    if not text or (len(text) <= PLACEHOLDER_MAX_LENGTH and text.lower() in PLACEHOLDER_LABELS):
         return "Unknown"
     return text
 
 
+def normalize_quality(quality: str | None) -> str:
+    return _normalize_label(quality)
+
+
 def normalize_size(size: str | None) -> str:
-    text = str(size or "").strip()
-    if not text or text.lower() in {"unknown", "n/a", "na", "none", "null"}:
-        return "Unknown"
-    return text
+    return _normalize_label(size)
 
 
 def _episode_number_from_text(value: str) -> int | None:
     if not value:
         return None
-    match = re.search(r"(?:e|ep|episode)\s*0*(\d+)", value, re.IGNORECASE)
+    match = EPISODE_NUMBER_PATTERN.search(value)
     if match:
         return int(match.group(1))
     return None
 
 
 def normalize_download_links(raw_links: Any) -> list[dict[str, str]]:
-    links: list[dict[str, str]] = []
-    seen: set[str] = set()
+    links: dict[str, dict[str, str]] = {}
 
     def add(url: Any, quality: str = "Unknown", size: str = "Unknown") -> None:
         if not isinstance(url, str):
             return
         cleaned = url.strip()
-        if not cleaned.startswith(("http://", "https://")) or cleaned in seen:
+        if cleaned in links or not cleaned.startswith(("http://", "https://")):
             return
-        links.append({"quality": normalize_quality(quality), "size": normalize_size(size), "url": cleaned})
-        seen.add(cleaned)
-
-    def walk(node: Any, quality: str = "Unknown", size: str = "Unknown") -> None:
-        if isinstance(node, str):
+        links[cleaned] = {"quality": normalize_quality(quality), "size": normalize_size(size), "url": cleaned}
+
+    # Explicit stack instead of recursion; children are pushed in reverse so links keep document order.
+    stack: list[tuple[Any, str, str]] = [(raw_links, "Unknown", "Unknown")]
+    while stack:
+        node, quality, size = stack.pop()
+        # Decoded JSON only yields exact builtin types, so identity checks stand in for isinstance.
+        node_type = type(node)
+        if node_type is str:
             add(node, quality, size)
-            return
-        if isinstance(node, list):
-            for item in node:
-                walk(item, quality, size)
-            return
-        if not isinstance(node, dict):
-            return
-
-        current_quality = node.get("quality") or node.get("label") or node.get("name") or quality
-        current_size = node.get("size") or node.get("fileSize") or size
-
-        add(
-            node.get("url")
-            or node.get("link")
-            or node.get("directLink")
-            or node.get("download")
-            or node.get("downloadUrl")
-            or node.get("href"),
-            current_quality,
-            current_size,
-        )
+            continue
+        if node_type is list:
+            stack.extend((item, quality, size) for item in reversed(node))
+            continue
+        if node_type is not dict:
+            continue
 
+        # One pass over the items: pick the best-ranked truthy url/quality/size field and collect children.
+        found: list[Any] = [None, None, None]
+        ranks = [len(FIELD_KEY_RANKS)] * 3
+        children: list[tuple[Any, str | None]] = []
         for key, value in node.items():
-            next_quality = current_quality
-            if isinstance(key, str) and re.search(r"\b(\d{3,4}p|4k|hd|fhd|uhd|cam|hdrip|webrip)\b", key, re.IGNORECASE):
-                next_quality = key.strip()
-            if isinstance(value, (str, list, dict)):
-                walk(value, next_quality, current_size)
+            slot = FIELD_KEY_RANKS.get(key)
+            if slot is not None and value:
+                field, rank = slot
+                if rank < ranks[field]:
+                    ranks[field] = rank
+                    found[field] = value
+            if type(value) not in WALKABLE_TYPES:
+                continue
+            key_quality = None
+            if isinstance(key, str) and len(key) > 1 and QUALITY_KEY_PATTERN.search(key):
+                key_quality = key.strip()
+            children.append((value, key_quality))
 
-    walk(raw_links)
-    return links
+        url, node_quality, node_size = found
+        current_quality = node_quality or quality
+        current_size = node_size or size
+        add(url, current_quality, current_size)
+        stack.extend((value, key_quality or current_quality, current_size) for value, key_quality in reversed(children))
+
+    return list(links.values())
 
 
 def normalize_details_payload(raw: dict[str, Any], fallback_title: str = "Unknown") -> dict[str, Any]:
     title = raw.get("title") or fallback_title
-    image_url = str(raw.get("imageUrl") or raw.get("image") or "").strip()
-    raw_type = str(raw.get("type") or "movie").lower()
-    payload_type = "series" if raw_type == "series" or raw.get("episodes") else "movie"
+    image_url = raw.get("imageUrl") or raw.get("image") or ""
+    image_url = image_url.strip() if isinstance(image_url, str) else str(image_url).strip()
+    raw_type = raw.get("type")
+    is_series = isinstance(raw_type, str) and raw_type.lower() == "series"
+    payload_type = "series" if is_series or raw.get("episodes") else "movie"
 
     base_links = normalize_download_links(raw.get("downloadLinks") or raw.get("links") or raw.get("downloads"))
 
     episodes: list[dict[str, Any]] = []
+    # The API usually lists episodes in order already, so only sort when one is seen out of place.
+    in_order = True
+    previous_number = 0
     for index, episode in enumerate(raw.get("episodes") or [], start=1):
         episode_number = episode.get("episodeNumber")
         if not isinstance(episode_number, int):
@@ -160,9 +223,14 @@ def normalize_details_payload(raw: dict[str, Any], fallback_title: str = "Unknow
             episode.get("downloadLinks") or episode.get("links") or episode.get("downloads")
         )
         if episode_links:
-            episodes.append({"episodeNumber": int(episode_number), "downloadLinks": episode_links})
+            episode_number = int(episode_number)
+            if episode_number < previous_number:
+                in_order = False
+            previous_number = episode_number
+            episodes.append({"episodeNumber": episode_number, "downloadLinks": episode_links})
 
-    episodes.sort(key=lambda item: item["episodeNumber"])
+    if not in_order:
+        episodes.sort(key=operator.itemgetter("episodeNumber"))
 
     clean_payload: dict[str, Any] = {
         "success": True,
@@ -191,111 +259,263 @@ def extract_details_payload(data: Any) -> dict[str, Any] | None:
     return data
 
 
-async def desiremovies_search(session: aiohttp.ClientSession, query: str) -> list[dict[str, Any]]:
-    endpoints = ("/api/desiremovies/search", "/api/desiremoviess/search")
-    for endpoint in endpoints:
-        url = f"{API_BASE_URL}{endpoint}"
-        async with session.get(url, params={"q": query}, headers=HEADERS) as response:
-            if response.status != 200:
-                continue
+def _cache_get(cache: OrderedDict[str, tuple[float, Any]], key: str, ttl: float) -> Any:
+    entry = cache.get(key)
+    if entry is None:
+        return None
 
-            data = await response.json()
-            items = data.get("results") if isinstance(data, dict) else data
-            if not isinstance(items, list):
-                continue
+    stored_at, value = entry
+    if time.monotonic() - stored_at >= ttl:
+        cache.pop(key, None)
+        return None
 
-            results: list[dict[str, Any]] = []
-            for item in items:
-                title = str(item.get("title") or "Unknown").strip()
-                link = item.get("url") or item.get("link")
-                if title and isinstance(link, str) and link.strip():
-                    results.append(
-                        {
-                            "id": str(item.get("id") or "").strip(),
-                            "title": title,
-                            "url": link.strip(),
-                            "imageUrl": str(item.get("imageUrl") or item.get("image") or "").strip(),
-                            "description": str(item.get("description") or "").strip(),
-                        }
-                    )
-            if results:
-                return results
-    return []
+    cache.move_to_end(key)
+    return value
 
 
-async def desiremovies_details(session: aiohttp.ClientSession, movie_url: str, fallback_title: str) -> dict[str, Any] | None:
-    endpoints = ("/api/desiremovies/details", "/api/desiremoviess/details")
-    for endpoint in endpoints:
-        url = f"{API_BASE_URL}{endpoint}"
-        async with session.get(url, params={"url": movie_url}, headers=HEADERS) as response:
-            if response.status != 200:
-                continue
+def _cache_put(cache: OrderedDict[str, tuple[float, Any]], key: str, value: Any, max_entries: int) -> None:
+    cache[key] = (time.monotonic(), value)
+    cache.move_to_end(key)
+    while len(cache) > max_entries:
+        cache.popitem(last=False)
 
-            data = await response.json()
-            payload = extract_details_payload(data)
-            if not payload:
+
+async def _read_json_capped(response: aiohttp.ClientResponse) -> Any:
+    # Bound per-request memory: refuse oversized bodies up front and stop reading once past the cap.
+    if response.content_length is not None and response.content_length > MAX_RESPONSE_BYTES:
+        logger.warning("Upstream response too large (%s bytes): %s", response.content_length, response.url)
+        return None
+    body = bytearray()
+    async for chunk in response.content.iter_chunked(65536):
+        body.extend(chunk)
+        if len(body) > MAX_RESPONSE_BYTES:
+            logger.warning("Upstream response exceeded %s bytes: %s", MAX_RESPONSE_BYTES, response.url)
+            return None
+    try:
+        return orjson.loads(body)
+    except ValueError:
+        logger.warning("Upstream returned invalid JSON: %s", response.url)
+        return None
+
+
+async def _fetch_json(session: aiohttp.ClientSession, url: URL) -> Any:
+    # Upstream GETs are idempotent, so 5xx answers and connection errors are retried with backoff.
+    # All attempts share one UPSTREAM_TIMEOUT.total budget, so retries never hold a user past it.
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + UPSTREAM_TIMEOUT.total
+    for attempt in range(FETCH_ATTEMPTS):
+        backoff = RETRY_BACKOFF_SECONDS * 2**attempt
+        try:
+            # Cap concurrent upstream requests; backoff sleeps happen outside so they don't hold a slot.
+            async with UPSTREAM_SEMAPHORE:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                timeout = aiohttp.ClientTimeout(
+                    total=remaining, connect=UPSTREAM_TIMEOUT.connect, sock_read=UPSTREAM_TIMEOUT.sock_read
+                )
+                async with session.get(url, timeout=timeout) as response:
+                    if response.status < 500:
+                        return await _read_json_capped(response) if response.status == 200 else None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == FETCH_ATTEMPTS - 1 or loop.time() + backoff >= deadline:
+                raise
+        else:
+            if attempt == FETCH_ATTEMPTS - 1 or loop.time() + backoff >= deadline:
+                return None
+        await asyncio.sleep(backoff)
+    return None
+
+
+def _parse_search_results(data: Any) -> list[dict[str, Any]]:
+    items = data.get("results") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return []
+
+    results: list[dict[str, Any]] = []
+    for item in items:
+        title = str(item.get("title") or "Unknown").strip()
+        link = item.get("url") or item.get("link")
+        if title and isinstance(link, str) and link.strip():
+            results.append(
+                {
+                    "id": str(item.get("id") or "").strip(),
+                    "title": title,
+                    "url": link.strip(),
+                    "imageUrl": str(item.get("imageUrl") or item.get("image") or "").strip(),
+                    "description": str(item.get("description") or "").strip(),
+                }
+            )
+    return results
+
+
+async def _fetch_first(
+    session: aiohttp.ClientSession,
+    endpoints: tuple[URL, ...],
+    params: dict[str, str],
+    parse: Callable[[Any], T | None],
+) -> T | None:
+    # Endpoint variants race each other; the first usable answer wins and the rest are cancelled.
+    tasks = [asyncio.create_task(_fetch_json(session, endpoint.with_query(params))) for endpoint in endpoints]
+    errors: list[Exception] = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                data = await next_done
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                logger.error("Upstream request failed: %s", exc)
+                errors.append(exc)
                 continue
-            return normalize_details_payload(payload, fallback_title=fallback_title)
+
+            result = parse(data)
+            if result:
+                return result
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if len(errors) == len(tasks):
+        error = errors[0]
+        if not isinstance(error, aiohttp.ClientError):
+            # aiohttp's total timeout raises a bare TimeoutError; callers only handle ClientError.
+            raise aiohttp.ServerTimeoutError(f"Upstream request timed out: {error}") from error
+        raise error
     return None
 
 
+async def _single_flight(key: str, fetch: Callable[[], Awaitable[T]]) -> T:
+    # Concurrent cache misses for one key share a single upstream fetch. shield() keeps one caller's
+    # cancellation from cancelling the fetch for everyone else waiting on it.
+    task = INFLIGHT_FETCHES.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        INFLIGHT_FETCHES[key] = task
+        task.add_done_callback(lambda _: INFLIGHT_FETCHES.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def desiremovies_search(session: aiohttp.ClientSession, query: str) -> list[dict[str, Any]]:
+    # Queries that differ only in case or surrounding whitespace share one cache entry.
+    cache_key = query.strip().lower()
+    cached = _cache_get(SEARCH_CACHE, cache_key, SEARCH_CACHE_TTL_SECONDS)
+    if cached is not None:
+        return cached
+
+    async def fetch() -> list[dict[str, Any]]:
+        results = await _fetch_first(session, SEARCH_ENDPOINTS, {"q": query}, _parse_search_results)
+        if not results:
+            return []
+
+        _cache_put(SEARCH_CACHE, cache_key, results, SEARCH_CACHE_MAX_ENTRIES)
+        return results
+
+    return await _single_flight(f"search:{cache_key}", fetch)
+
+
+async def desiremovies_details(session: aiohttp.ClientSession, movie_url: str, fallback_title: str) -> dict[str, Any] | None:
+    # Cached and coalesced payloads are shared across callers, so they are normalized without a
+    # fallback title and each caller's own fallback is applied on the way out.
+    def parse(data: Any) -> dict[str, Any] | None:
+        payload = extract_details_payload(data)
+        return normalize_details_payload(payload, fallback_title="") if payload else None
+
+    async def fetch() -> dict[str, Any] | None:
+        details = await _fetch_first(session, DETAILS_ENDPOINTS, {"url": movie_url}, parse)
+        if details:
+            _cache_put(DETAILS_CACHE, movie_url, details, DETAILS_CACHE_MAX_ENTRIES)
+        return details
+
+    details = _cache_get(DETAILS_CACHE, movie_url, DETAILS_CACHE_TTL_SECONDS)
+    if details is None:
+        details = await _single_flight(f"details:{movie_url}", fetch)
+    if details and not details["title"]:
+        details = {**details, "title": fallback_title}
+    return details
+
+
+CANCEL_ROW = (InlineKeyboardButton("❌ Cancel", callback_data="cancel"),)
+NEW_SEARCH_ROW = (InlineKeyboardButton("🔍 New Search", callback_data="new_search"),)
+
+
 def build_search_keyboard(results: list[dict[str, Any]]) -> InlineKeyboardMarkup:
     keyboard = [[InlineKeyboardButton(item["title"], callback_data=f"movie_{index}")] for index, item in enumerate(results)]
-    keyboard.append([InlineKeyboardButton("❌ Cancel", callback_data="cancel")])
+    keyboard.append(CANCEL_ROW)
     return InlineKeyboardMarkup(keyboard)
 
 
+def _prune_redirects(now: float) -> None:
+    # Every token shares one TTL, so insertion order is expiry order and stale entries sit at the front.
+    while LINK_REDIRECTS:
+        _, expires_at = next(iter(LINK_REDIRECTS.values()))
+        if expires_at > now and len(LINK_REDIRECTS) <= MAX_REDIRECTS:
+            break
+        LINK_REDIRECTS.popitem(last=False)
+
+
 def _build_redirect_url(target_url: str, proxy_base_url: str | None) -> str:
     if not proxy_base_url:
         return target_url
 
-    token = secrets.token_urlsafe(8)
-    LINK_REDIRECTS[token] = (target_url, time.time() + REDIRECT_TTL_SECONDS)
+    # 6 random bytes encode to exactly 8 base64 characters, so there is no padding to strip.
+    token = urlsafe_b64encode(os.urandom(6)).decode("ascii")
+    now = time.monotonic()
+    LINK_REDIRECTS[token] = (target_url, now + REDIRECT_TTL_SECONDS)
+    _prune_redirects(now)
     return f"{proxy_base_url.rstrip('/')}/r/{token}"
 
 
 def build_download_keyboard(download_links: list[dict[str, str]], proxy_base_url: str | None = None) -> InlineKeyboardMarkup:
-    rows = []
-    for link in download_links:
-        label = f"🎬 {normalize_quality(link.get('quality'))} | {normalize_size(link.get('size'))}"
-        rows.append([InlineKeyboardButton(label, url=_build_redirect_url(link["url"], proxy_base_url))])
-    rows.append([InlineKeyboardButton("🔍 New Search", callback_data="new_search")])
+    rows = [
+        [
+            InlineKeyboardButton(
+                f"🎬 {link['quality']} | {link['size']}",
+                url=_build_redirect_url(link["url"], proxy_base_url),
+            )
+        ]
+        for link in download_links
+    ]
+    rows.append(NEW_SEARCH_ROW)
     return InlineKeyboardMarkup(rows)
 
 
 def build_episode_keyboard(episodes: list[dict[str, Any]]) -> InlineKeyboardMarkup:
     rows = [[InlineKeyboardButton(f"Episode {ep['episodeNumber']}", callback_data=f"episode_{idx}")] for idx, ep in enumerate(episodes)]
-    rows.append([InlineKeyboardButton("🔍 New Search", callback_data="new_search")])
+    rows.append(NEW_SEARCH_ROW)
     return InlineKeyboardMarkup(rows)
 
 
+WELCOME_TEXT = "🎬 <b>Welcome!</b>\nUse /search &lt;movie name&gt; to find titles from DesireMovies."
+HELP_TEXT = (
+    "Use /search &lt;movie name&gt;\n"
+    "• Select a title\n"
+    "• Get premium inline download buttons\n"
+    "• Web series are grouped episode-wise"
+)
+SEARCH_USAGE_TEXT = "Please provide a movie name.\nExample: /search inception"
+SEARCHING_TEXT = "🔍 Searching for: <code>{query}</code>"
+SEARCH_ERROR_TEXT = "Unable to reach the API right now. Please try again."
+DETAILS_ERROR_TEXT = "Unable to fetch details right now."
+
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    await update.message.reply_text(
-        "🎬 <b>Welcome!</b>\nUse /search &lt;movie name&gt; to find titles from DesireMovies.",
-        parse_mode="HTML",
-    )
+    await update.message.reply_text(WELCOME_TEXT, parse_mode="HTML")
 
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    await update.message.reply_text(
-        "Use /search &lt;movie name&gt;\n"
-        "• Select a title\n"
-        "• Get premium inline download buttons\n"
-        "• Web series are grouped episode-wise",
-    )
+    await update.message.reply_text(HELP_TEXT)
 
 
 async def search_movies(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query_text = " ".join(context.args).strip()
     if not query_text:
-        await update.message.reply_text("Please provide a movie name.\nExample: /search inception")
+        await update.message.reply_text(SEARCH_USAGE_TEXT)
         return ConversationHandler.END
 
-    status_message = await update.message.reply_text(f"🔍 Searching for: <code>{query_text}</code>", parse_mode="HTML")
+    status_message = await update.message.reply_text(SEARCHING_TEXT.format(query=query_text), parse_mode="HTML")
 
     try:
-        async with aiohttp.ClientSession() as session:
-            results = await desiremovies_search(session, query_text)
+        results = await desiremovies_search(context.bot_data["http_session"], query_text)
         if not results:
             await status_message.edit_text("No results found.")
             return ConversationHandler.END
@@ -307,7 +527,7 @@ async def search_movies(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         )
         return SELECTING_ITEM
     except aiohttp.ClientError:
-        await status_message.edit_text("Unable to reach the API right now. Please try again.")
+        await status_message.edit_text(SEARCH_ERROR_TEXT)
         return ConversationHandler.END
 
 
@@ -330,9 +550,7 @@ async def on_movie_selected(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await query.edit_message_text(f"Fetching: {selected['title']}")
 
     try:
-        async with aiohttp.ClientSession() as session:
-            details = await desiremovies_details(session, selected["url"], selected["title"])
-
+        details = await desiremovies_details(context.bot_data["http_session"], selected["url"], selected["title"])
         if not details:
             await query.edit_message_text("Invalid link or details not available.")
             return ConversationHandler.END
@@ -360,7 +578,7 @@ async def on_movie_selected(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
         return ConversationHandler.END
     except aiohttp.ClientError:
-        await query.edit_message_text("Unable to fetch details right now.")
+        await query.edit_message_text(DETAILS_ERROR_TEXT)
         return ConversationHandler.END
 
 
@@ -399,11 +617,12 @@ async def redirect_download(request: web.Request) -> web.Response:
         return web.Response(status=404, text="Link expired or invalid")
 
     target_url, expires_at = entry
-    if time.time() > expires_at:
-        LINK_REDIRECTS.pop(token, None)
+    remaining = expires_at - time.monotonic()
+    if remaining < 0:
         return web.Response(status=410, text="Link expired")
 
-    return web.HTTPFound(location=target_url)
+    # Let the client reuse the redirect on repeat taps until the token expires.
+    return web.HTTPFound(location=target_url, headers={"Cache-Control": f"private, max-age={int(remaining)}"})
 
 
 async def new_search(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -421,52 +640,57 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
 
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    if not update.message or not update.message.text or update.message.text.startswith("/"):
+    if not update.message or not update.message.text:
         return ConversationHandler.END
-    context.args = update.message.text.split()
+    # search_movies joins the args back into one query, so pass the text through untokenized.
+    context.args = [update.message.text]
     return await search_movies(update, context)
 
 
+def _json_response(payload: Any, status: int = 200) -> web.Response:
+    return web.Response(body=orjson.dumps(payload), status=status, content_type="application/json")
+
+
 async def health_check(request: web.Request) -> web.Response:
-    return web.json_response({"status": "ok"})
+    return _json_response({"status": "ok"})
 
 
 async def search_api(request: web.Request) -> web.Response:
     query = (request.query.get("q") or "").strip()
     if not query:
-        return web.json_response({"success": False, "error": "Missing query parameter: q"}, status=400)
+        return _json_response({"success": False, "error": "Missing query parameter: q"}, status=400)
 
     try:
-        async with aiohttp.ClientSession() as session:
-            results = await desiremovies_search(session, query)
+        results = await desiremovies_search(request.app[HTTP_SESSION_KEY], query)
     except aiohttp.ClientError:
-        return web.json_response({"success": False, "error": "Unable to reach upstream API"}, status=502)
+        return _json_response({"success": False, "error": "Unable to reach upstream API"}, status=502)
 
-    return web.json_response({"query": query, "results": results})
+    return _json_response({"query": query, "results": results})
 
 
 async def details_api(request: web.Request) -> web.Response:
     movie_url = (request.query.get("url") or "").strip()
     if not movie_url:
-        return web.json_response({"success": False, "error": "Missing query parameter: url"}, status=400)
+        return _json_response({"success": False, "error": "Missing query parameter: url"}, status=400)
 
     fallback_title = (request.query.get("title") or "Unknown").strip() or "Unknown"
     try:
-        async with aiohttp.ClientSession() as session:
-            details = await desiremovies_details(session, movie_url, fallback_title)
+        details = await desiremovies_details(request.app[HTTP_SESSION_KEY], movie_url, fallback_title)
     except aiohttp.ClientError:
-        return web.json_response({"success": False, "error": "Unable to reach upstream API"}, status=502)
+        return _json_response({"success": False, "error": "Unable to reach upstream API"}, status=502)
 
     if not details:
-        return web.json_response({"success": False, "error": "Details not found"}, status=404)
+        return _json_response({"success": False, "error": "Details not found"}, status=404)
 
-    return web.json_response(details)
+    return _json_response(details)
 
 
 async def start_http_server(application: Application) -> None:
     if not ENABLE_HTTP_SERVER:
         return
     http_app = web.Application()
+    # The API routes reuse the bot's pooled upstream session; it outlives this server.
+    http_app[HTTP_SESSION_KEY] = application.bot_data["http_session"]
     http_app.router.add_get("/", health_check)
     http_app.router.add_get("/health", health_check)
     http_app.router.add_get("/r/{token}", redirect_download)
@@ -486,21 +710,51 @@ async def stop_http_server(application: Application) -> None:
         await runner.cleanup()
 
 
+async def open_http_session(application: Application) -> None:
+    application.bot_data["http_session"] = aiohttp.ClientSession(
+        # Every request goes to the one API_BASE_URL host, so the pool is sized to the upstream semaphore.
+        connector=aiohttp.TCPConnector(limit=UPSTREAM_CONCURRENCY, ttl_dns_cache=300, keepalive_timeout=75),
+        timeout=UPSTREAM_TIMEOUT,
+        headers=HEADERS,
+    )
+
+
+async def close_http_session(application: Application) -> None:
+    session = application.bot_data.pop("http_session", None)
+    if session:
+        await session.close()
+
+
 async def initialize_polling(application: Application) -> None:
+    await open_http_session(application)
     await application.bot.delete_webhook(drop_pending_updates=True)
     await start_http_server(application)
 
 
+async def shutdown_polling(application: Application) -> None:
+    await stop_http_server(application)
+    await close_http_session(application)
+
+
 def main() -> None:
     token = validate_bot_token(BOT_TOKEN)
     if not API_KEY:
         raise RuntimeError("API_KEY is required")
 
+    try:
+        import uvloop
+    except ImportError:
+        pass
+    else:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
     resolved_webhook_url = infer_webhook_url()
 
     builder = Application.builder().token(token)
-    if not resolved_webhook_url:
-        builder = builder.post_init(initialize_polling).post_shutdown(stop_http_server)
+    if resolved_webhook_url:
+        builder = builder.post_init(open_http_session).post_shutdown(close_http_session)
+    else:
+        builder = builder.post_init(initialize_polling).post_shutdown(shutdown_polling)
 
     app = builder.build()
     app.bot_data["public_base_url"] = resolved_webhook_url or ""
@@ -512,10 +766,10 @@ def main() -> None:
         ],
         states={
             SELECTING_ITEM: [
-                CallbackQueryHandler(on_movie_selected, pattern=r"^movie_\d+$"),
-                CallbackQueryHandler(on_episode_selected, pattern=r"^episode_\d+$"),
-                CallbackQueryHandler(new_search, pattern=r"^new_search$"),
-                CallbackQueryHandler(cancel, pattern=r"^cancel$"),
+                CallbackQueryHandler(on_movie_selected, pattern=MOVIE_PATTERN),
+                CallbackQueryHandler(on_episode_selected, pattern=EPISODE_PATTERN),
+                CallbackQueryHandler(new_search, pattern=NEW_SEARCH_PATTERN),
+                CallbackQueryHandler(cancel, pattern=CANCEL_PATTERN),
             ]
         },
         fallbacks=[CommandHandler("cancel", cancel)],